@@ -1,8 +1,62 @@
-import notify2
+import time as _time
+import os as _os
+import weakref as _weakref
 from datetime import datetime
 
+try:
+  import notify2
+except ImportError:
+  # Only needed for notifications with priority PRIO_MID or higher.
+  notify2 = None
+
 PRIO_NONE, PRIO_LOW, PRIO_MID, PRIO_HIGH = range(4)
 
+# Written to the notify file after each batch of messages.
+_DELIM = '-'*40 + '\n'
+
+# Minute of the last formatted timestamp and the timestamp itself.
+_LAST_MIN = [None, None]
+
+def _now_str():
+  """Return the current time formatted for the notify and error files.
+  The format has minute resolution, so it is only recomputed once per minute.
+  """
+  now = _time.time()
+  m = int(now // 60)
+  if m != _LAST_MIN[0]:
+    _LAST_MIN[0] = m
+    _LAST_MIN[1] = datetime.fromtimestamp(now).strftime("%d.%m, %H:%M")
+  return _LAST_MIN[1]
+
+def _write_all(fd, text):
+  """Write text to the file descriptor fd."""
+  data = text.encode()
+  while data:
+    data = data[_os.write(fd, data):]
+
+def _flush(notifyFd, errFd, pendingNotify, pendingErr):
+  """Write the pending notify lines, followed by the delimiter,
+  and the pending errors to their files and clear both lists.
+  """
+  if pendingNotify:
+    pendingNotify.append(_DELIM)
+    _write_all(notifyFd, ''.join(pendingNotify))
+    pendingNotify.clear()
+  if pendingErr:
+    _write_all(errFd, ''.join(pendingErr))
+    pendingErr.clear()
+
+def _flush_and_close(notifyFd, errFd, pendingNotify, pendingErr):
+  """Flush the pending lines and close both files.
+  Used as finalizer of a Notifier, so it must not reference it.
+  """
+  try:
+    _flush(notifyFd, errFd, pendingNotify, pendingErr)
+  finally:
+    _os.close(notifyFd)
+    _os.close(errFd)
+
+
 class Notifier(object):
   """
   Write status updates and errors to a file and send notifications.
@@ -15,6 +69,11 @@ class Notifier(object):
       notification is sent.
     PRIO_HIGH; Message is written to given file and a long
       notification is sent.
+
+  The files are kept open until `close` is called, which can
+  also be done by using the notifier in a `with` statement.
+  Otherwise they are flushed and closed when the notifier is
+  garbage collected or the program exits.
   """
   def __init__(self, notifyFile, errorFile, name="", ):
     """
@@ -31,52 +90,100 @@ class Notifier(object):
     self.errorFile = errorFile
     self.name = name
     self._text = f'{name + ": " if name else ""}Check notification file'
-    notify2.init(self.name)
-    self.notification = notify2.Notification(self._text)
+    # Normal and critical notification, created on the
+    # first notification that has to be shown.
+    self.notification = None
+    self._notification_critical = None
     self._show_notification = False
-    self._empty = True
+    self._urgency_high = False
+    # Lines waiting to be written to the notify and error file.
+    self._pending_notify = []
+    self._pending_err = []
+    # Keep both files open, so that a flush is a single write.
+    flags = _os.O_WRONLY | _os.O_CREAT | _os.O_APPEND
+    self._notify_fd = _os.open(notifyFile, flags, 0o644)
+    try:
+      self._err_fd = _os.open(errorFile, flags, 0o644)
+    except BaseException:
+      _os.close(self._notify_fd)
+      raise
+    # Does not keep the notifier alive, unlike an atexit handler.
+    self._finalizer = _weakref.finalize(
+      self, _flush_and_close, self._notify_fd, self._err_fd,
+      self._pending_notify, self._pending_err)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
 
   def add_notification(self, msg, priority):
     """Add a message with the given priority to the notifier.
     See documentation of Notifier for the available priorities.
     """
-    self._empty = False
     if priority > PRIO_NONE:
       self._write_to_notify_file(msg, priority)
     if priority >= PRIO_MID:
+      self._ensure_notify()
       self._show_notification = True
     if priority >= PRIO_HIGH:
-      self.notification.set_urgency(notify2.URGENCY_CRITICAL)
+      self._urgency_high = True
 
   def add_error(self, msg):
-    """Write msg to the error file."""
-    current_time = datetime.now().strftime("%d.%m, %H:%M")
-    msg = f'{current_time} Caught error >> {msg}\n'
-    with open(self.errorFile, 'a') as f:
-      f.write(msg)
+    """Add msg to the error file. The message is not written
+    immediately but buffered until the next call of
+    `show_notifications`.
+    """
+    current_time = _now_str()
+    self._pending_err.append(f'{current_time} Caught error >> {msg}\n')
 
   def show_notifications(self):
-    """Show any queued up notifications and write
-    a delimiter to the notifyFile. Call periodically
-    to flush notifications.
+    """Show any queued up notifications and write the
+    queued messages and a delimiter to the notifyFile and
+    the queued errors to the errorFile. Call periodically
+    to flush notifications; messages and errors are only
+    written to the files here.
     """
-    if not self._empty:
-      with open(self.notifyFile, 'a') as f:
-        f.write('-'*40 + '\n')
+    if not self._finalizer.alive:
+      raise ValueError('Notifier has been closed')
+    _flush(self._notify_fd, self._err_fd,
+           self._pending_notify, self._pending_err)
     if self._show_notification:
-      self.notification.show()
+      if self._urgency_high:
+        self._notification_critical.show()
+      else:
+        self.notification.show()
     self._reset()
 
+  def close(self):
+    """Write queued messages and errors to their files,
+    without showing a notification, and close the files.
+    Calling it again has no effect.
+    """
+    self._finalizer()
+
   def _reset(self):
     """Reset private attributes."""
     self._show_notification = False
-    self.notification.set_urgency(notify2.URGENCY_NORMAL)
-    self._empty = True
+    self._urgency_high = False
+
+  def _ensure_notify(self):
+    """Initialize notify2 and create the normal and the
+    critical notification if this has not been done yet.
+    """
+    if self.notification is not None:
+      return
+    if notify2 is None:
+      raise ImportError('notify2 is required for notifications '
+                        'with priority PRIO_MID or higher')
+    notify2.init(self.name)
+    self.notification = notify2.Notification(self._text)
+    self._notification_critical = notify2.Notification(self._text)
+    self._notification_critical.set_urgency(notify2.URGENCY_CRITICAL)
 
 
   def _write_to_notify_file(self, msg, priority):
-    """Write to the notifyFile, adding the current time."""
-    current_time = datetime.now().strftime("%d.%m, %H:%M")
-    msg = f'{current_time} ({priority}) >> {msg}\n'
-    with open(self.notifyFile, 'a') as f:
-      f.write(msg)
+    """Queue a line for the notifyFile, adding the current time."""
+    current_time = _now_str()
+    self._pending_notify.append(f'{current_time} ({priority}) >> {msg}\n')
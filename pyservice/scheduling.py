@@ -1,17 +1,28 @@
 import time as _time
-import sched as _sched
+import heapq as _heapq
+import threading as _threading
+import itertools as _itertools
 import sys
+from collections import namedtuple as _namedtuple
 
-from . import util
 
+# Events are ordered by time, priority and sequence number. The sequence
+# number is unique, so the remaining fields are never compared.
+# `alive` is a one-element list that is set to `[False]` when the event
+# is cancelled, delayed or executed.
+Event = _namedtuple('Event', 'time, priority, sequence, action, argument, kwargs, alive')
 
-class PeriodicScheduler(_sched.scheduler):
+
+class PeriodicScheduler(object):
   """
   Schedule periodic jobs, i.e. jobs that should be executed
   periodically with a fixed time delay.
   Aditionally, a minimum time delay can be given so that
   no two actions are executed in a time period smaller than
   the mimimum delay.
+
+  The events are kept in a heap. Cancelled and delayed events are only
+  marked as dead and skipped when they reach the top of the heap.
   """
 
   def __init__(self, timefunc=_time.monotonic, delayfunc=_time.sleep, 
@@ -21,17 +32,86 @@ class PeriodicScheduler(_sched.scheduler):
     time distance that two actions should have.
     The minDelay is multiplied with the bufferFactor to
     account for inaccuracies.
-    Calls the parent class constructor with the remaining arguments.
+    `timefunc` and `delayfunc` are used like in `sched.scheduler`.
     """
     self.minDelay = minDelay
     self._minDelay = minDelay*bufferFactor
-    super(PeriodicScheduler, self).__init__(timefunc, delayfunc)
-
-  def _enter(self, *args, **kwargs):
-    """Calls the `enter` function of the parent class."""
-    super(PeriodicScheduler, self).enter(*args, **kwargs)
+    self.timefunc = timefunc
+    self.delayfunc = delayfunc
+    self._heap = []
+    # Number of dead events that are still in the heap.
+    self._dead = 0
+    self._lock = _threading.RLock()
+    self._sequence = _itertools.count()
+
+  def enterabs(self, time, priority, action, argument=(), kwargs={}):
+    """
+    Schedule action to be called with argument and kwargs at `time`.
+    Return the event, which can be used to cancel it.
+    """
+    event = Event(time, priority, next(self._sequence),
+                  action, argument, kwargs, [True])
+    with self._lock:
+      _heapq.heappush(self._heap, event)
+    return event
 
-  def enter(self, delay, priority, action, args=(), kwargs={}, lastExecution=None):
+  def cancel(self, event):
+    """
+    Remove an event from the queue.
+    Raise a ValueError if the event is not in the queue.
+    """
+    with self._lock:
+      if not event.alive[0]:
+        raise ValueError('event is not in the queue')
+      event.alive[0] = False
+      self._dead += 1
+      self._compact()
+
+  def empty(self):
+    """Check whether the queue is empty."""
+    with self._lock:
+      self._drop_dead()
+      return not self._heap
+
+  def run(self, blocking=True):
+    """
+    Execute events until the queue is empty.
+    If blocking is False, execute the events that are due and
+    return the time until the next event.
+    """
+    lock = self._lock
+    q = self._heap
+    delayfunc = self.delayfunc
+    timefunc = self.timefunc
+    while True:
+      with lock:
+        self._drop_dead()
+        if not q:
+          break
+        event = q[0]
+        now = timefunc()
+        if event.time > now:
+          delay = True
+        else:
+          delay = False
+          _heapq.heappop(q)
+          event.alive[0] = False
+      if delay:
+        if not blocking:
+          return event.time - now
+        delayfunc(event.time - now)
+      else:
+        event.action(*event.argument, **event.kwargs)
+        delayfunc(0)
+
+  @property
+  def queue(self):
+    """An ordered list of upcoming events."""
+    with self._lock:
+      return [e for e in sorted(self._heap) if e.alive[0]]
+
+  def enter(self, delay, priority, action, args=(), kwargs={}, lastExecution=None,
+            _skip_wrap=False):
     """
     Schedule a periodic job with period `delay`.
 
@@ -40,61 +120,86 @@ class PeriodicScheduler(_sched.scheduler):
     Every `delay` time units (first: delay units from lastExecution
     or delay units from now), action will be executed
     with the arguments args and kwargs. The priority is passed
-    to the enter function of the parent.
+    to `enterabs`.
+    `_skip_wrap` is used internally if action has already been
+    made periodic.
     """
-    periodicAction = self.periodic(delay, priority, action, args, kwargs)
+    if _skip_wrap:
+      periodicAction = action
+    else:
+      periodicAction = self.periodic(delay, priority, action, args, kwargs)
+    now = self.timefunc()
 
     if lastExecution is not None:
-      delay = delay + lastExecution - self.timefunc()
+      delay = delay + lastExecution - now
       delay = 0 if delay < 0 else delay
 
-    # Insert two fictional events (at the beginning and end of the queue)
-    # to ensure that there is a feasible slot between two events and to
-    # keep the minDelay from now.
-    delayList = [0]
-    delayList += [e.time - self.timefunc() for e in self.queue]
-    delayList.append(delayList[-1] + 2*delay + 2*self._minDelay)
-
-    slot = util.first_index(
-      delayList,
-      lambda l, i: (l[i+1] >= self._minDelay + delay and
-                    l[i+1] >= 2*self._minDelay + l[i])
-    )
-    # Schedule after event `slot`.
-    delay = max(delayList[slot] + self._minDelay, delay)
-    self._enter(delay, priority, periodicAction)
+    # Find the first gap between two consecutive events (with a fictional
+    # event now at the beginning and one far enough after the last event at
+    # the end) that leaves room for the new event while keeping the minDelay.
+    # The bounds are loop invariant, so compare absolute times against
+    # precomputed values instead of computing delays for every event.
+    earliest = now + self._minDelay + delay
+    minGap = 2*self._minDelay
+    prevTime = now
+    with self._lock:
+      events = sorted(self._heap)
+    for e in events:
+      if not e.alive[0]:
+        continue
+      time = e.time
+      if time >= earliest and time - prevTime >= minGap:
+        break
+      prevTime = time
+    # Schedule after the event preceding the slot.
+    delay = max(prevTime - now + self._minDelay, delay)
+    self.enterabs(now + delay, priority, periodicAction)
 
   def _push_event(self, ind, delay):
     """
     Pushes the event in the `ind` position of the queue back
     by `delay` time units.
 
-    Recursively call `_push_event` to
-    push back all subsequent events in order to keep
-    the minimal time distance between actions.
+    All subsequent events are pushed back as far as necessary
+    to keep the minimal time distance between actions.
     """
-
-    # Last event has no following events.
-    if ind == len(self.queue) - 1:
-      self._delay_event(self.queue[ind], delay)
-      return True
-
-    nextDelay = self._minDelay - (self.queue[ind+1].time - (self.queue[ind].time + delay))
-    nextDelay = 0 if nextDelay < 0 else nextDelay
-    self._push_event(ind+1, nextDelay)
-
-    self._delay_event(self.queue[ind], delay)
+    queue = self.queue
+    # Compute the delay of every event from the original times first,
+    # then delay the events starting with the last one.
+    delays = [delay]
+    for prev, cur in zip(queue[ind:], queue[ind+1:]):
+      nextDelay = self._minDelay - (cur.time - (prev.time + delays[-1]))
+      delays.append(0 if nextDelay < 0 else nextDelay)
+    for event, eventDelay in zip(reversed(queue[ind:]), reversed(delays)):
+      self._delay_event(event, eventDelay)
     return True
 
   def _delay_event(self, event, delay):
     """
     Delay an already scheduled event by delay time units
-    by canceling and rescheduling it. Will throw an error if
-    the event is not in the queue.
+    by marking it as dead and pushing a delayed copy.
     """
-    time, *args = event
-    self.cancel(event)
-    self.enterabs(time + delay, *args)
+    newEvent = event._replace(time=event.time + delay, alive=[True])
+    if newEvent.time == event.time:
+      return
+    with self._lock:
+      event.alive[0] = False
+      self._dead += 1
+      _heapq.heappush(self._heap, newEvent)
+      self._compact()
+
+  def _compact(self):
+    """Remove all dead events once they make up more than half of the heap."""
+    if 2*self._dead > len(self._heap):
+      self._heap[:] = [e for e in self._heap if e.alive[0]]
+      _heapq.heapify(self._heap)
+      self._dead = 0
+
+  def _drop_dead(self):
+    """Pop dead events off the top of the heap."""
+    while self._heap and not self._heap[0].alive[0]:
+      _heapq.heappop(self._heap)
+      self._dead -= 1
 
   def periodic(self, delay, priority, action, args=(), kwargs={}):
     """
@@ -110,17 +215,19 @@ class PeriodicScheduler(_sched.scheduler):
       # even if the program has been waiting (e.g. during computer-standby).
       self._check_min_delay()
       action(*args, **kwargs)
-      new_action = self.periodic(delay, priority, action, args, kwargs)
-      self.enter(delay, priority, new_action)
+      self.enter(delay, priority, periodic_action, _skip_wrap=True)
     return periodic_action
 
   def _check_min_delay(self):
     """Check if the next scheduled event is at least
     minDelay time units from now. If not, push it back sufficiently.
     """
-    if not self.queue:
-      return True
-    nextEventTime = self.queue[0].time
+    with self._lock:
+      # The root of the heap is the next event once dead events are dropped.
+      self._drop_dead()
+      if not self._heap:
+        return True
+      nextEventTime = self._heap[0].time
     delay = nextEventTime - self.timefunc()
     # Compare with unbuffered minDelay to compensate for the fact
     # that the check is done after the event is popped off the queue.
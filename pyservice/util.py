@@ -3,31 +3,43 @@ import os as _os
 import signal as _signal
 import threading as _threading
 import functools as _functools
+import re as _re
+
+# Strings accepted by `int`, used to avoid raising on invalid input.
+_INT_RE = _re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*')
 
 def safe_cast(t, s, default=None):
   """Cast s to type t. Return None if a ValueError
   or TypeError occurs.
+  Strings that are no valid integers are rejected without
+  raising an exception if t is int.
   """
+  if t is int and isinstance(s, str) and not _INT_RE.fullmatch(s):
+    return default
   try:
     return t(s)
   except (ValueError, TypeError):
     return default
 
 def sleep(n):
-  """Long-term precise sleep function."""
-  start = _time.time()
-  while _time.time() - start < n:
-    _time.sleep(n - (_time.time() - start))
+  """Long-term precise sleep function.
+  Uses the monotonic clock, so it is not affected by changes
+  of the system time. Sleeps again if woken up too early.
+  """
+  deadline = _time.monotonic() + n
+  remaining = n
+  while remaining > 0:
+    _time.sleep(remaining)
+    remaining = deadline - _time.monotonic()
 
 def read_lines(filePath):
   """Read stripped lines from a file, ignoring empy lines
   and lines starting with a `#`.
   """
   with open(filePath, 'r') as f:
-    lines = f.readlines()
-  lines = list(map(lambda l:l.strip(), lines))
-  lines = [line for line in lines if line and not line.startswith("#")]
-  return lines
+    data = f.read()
+  return [line for line in map(str.strip, data.split('\n'))
+          if line and line[0] != '#']
 
 def graceful_exit(shutdown_time):
   """
@@ -38,26 +50,43 @@ def graceful_exit(shutdown_time):
   exit with status code 1.
   If the function terminates in the given time frame, the program will
   exit with code 0.
+  The SIGTERM handler is installed once when `graceful_exit` is called.
+  While no decorated function is running, SIGTERM is passed on to
+  the previously installed handler.
   """
   _signal.signal(_signal.SIGUSR1, lambda s,f: exit(1))
   pid = _os.getpid()
+  original_sigTerm = _signal.getsignal(_signal.SIGTERM)
+  sigTermFlag = _threading.Event()
+  # Number of decorated functions that are currently running.
+  running = [0]
   def killer_thread():
     _time.sleep(shutdown_time)
     _os.kill(pid, _signal.SIGUSR1)
-  def start_killer_thread(sigTermFlag):
+  def start_killer_thread():
     sigTermFlag.set()
     thread = _threading.Thread(target=killer_thread)
     thread.daemon = True
     thread.start()
+  def handle_sigTerm(signum, frame):
+    if running[0]:
+      start_killer_thread()
+    elif callable(original_sigTerm):
+      original_sigTerm(signum, frame)
+    elif original_sigTerm != _signal.SIG_IGN:
+      # Default action, terminate the program.
+      _signal.signal(_signal.SIGTERM, _signal.SIG_DFL)
+      _os.kill(pid, _signal.SIGTERM)
+  _signal.signal(_signal.SIGTERM, handle_sigTerm)
 
   def decorator(fun):
     @_functools.wraps(fun)
     def finishing_fun(*args, **kwargs):
-      original_sigTerm = _signal.getsignal(_signal.SIGTERM)
-      sigTermFlag = _threading.Event()
-      _signal.signal(_signal.SIGTERM, lambda s,f: start_killer_thread(sigTermFlag))
-      res = fun(*args, **kwargs)
-      _signal.signal(_signal.SIGTERM, original_sigTerm)
+      running[0] += 1
+      try:
+        res = fun(*args, **kwargs)
+      finally:
+        running[0] -= 1
       if sigTermFlag.is_set():
         exit(0)
       return res
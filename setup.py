@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name='pyservice',
     version='1.0',
     description='Toolbox for running services with python.',
-    packages=find_packages(),
+    packages=['pyservice'],
     include_package_data=True,
     license='MIT License'
 )